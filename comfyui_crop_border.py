@@ -1,10 +1,92 @@
 import torch
 
+# Set True to print per-call detection diagnostics; the prints force
+# device-to-host syncs, so they stay off on the hot path
+DEBUG = False
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; detection falls back to torch ops
+    njit = None
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def _row_is_border(img, row, lo, hi):
+        for col in range(img.shape[1]):
+            for ch in range(img.shape[2]):
+                v = img[row, col, ch]
+                if v <= lo or v >= hi:
+                    return False
+        return True
+
+    @njit(cache=True, nogil=True)
+    def _col_is_border(img, col, lo, hi):
+        for row in range(img.shape[0]):
+            for ch in range(img.shape[2]):
+                v = img[row, col, ch]
+                if v <= lo or v >= hi:
+                    return False
+        return True
+
+    @njit(cache=True, nogil=True)
+    def _scan_borders(img, threshold, target):
+        """Scan inward from each edge of a HWC float array, stopping at the
+        first non-border row/column. No intermediate mask is allocated."""
+        H, W = img.shape[0], img.shape[1]
+        # Hoisted range bounds turn |v - target| < threshold into two plain
+        # compares per pixel, with no abs/sub in the inner loop
+        lo = target - threshold
+        hi = target + threshold
+        top = 0
+        while top < H and _row_is_border(img, top, lo, hi):
+            top += 1
+        bottom = H
+        while bottom > top and _row_is_border(img, bottom - 1, lo, hi):
+            bottom -= 1
+        left = 0
+        while left < W and _col_is_border(img, left, lo, hi):
+            left += 1
+        right = W
+        while right > left and _col_is_border(img, right - 1, lo, hi):
+            right -= 1
+        return top, bottom, left, right
+else:
+    _scan_borders = None
+
+
+def _border_counts_eager(img: torch.Tensor, threshold: float, targets: torch.Tensor):
+    """Per-row/per-column counts of non-border pixels for a HWC float image,
+    testing every pixel against each target color in one broadcasted pass"""
+    close = (img.unsqueeze(0) - targets.view(-1, 1, 1, 1)).abs_().lt_(threshold)
+    nonborder = ~close.any(dim=0).all(dim=-1)
+    return nonborder.sum(dim=1), nonborder.sum(dim=0)
+
+
+# Inductor fuses the abs/lt/any/all chain into a single pass over the image;
+# fall back to eager where torch.compile is unavailable (or at the call site
+# if compilation fails at runtime)
+_border_counts = _border_counts_eager
+if hasattr(torch, "compile"):
+    try:
+        _border_counts = torch.compile(
+            _border_counts_eager, mode="reduce-overhead", dynamic=True
+        )
+    except Exception:
+        pass
+
+
 class CropImageBorder:
     """
     ComfyUI node that detects and crops white/black borders from images
     """
-    
+
+    def __init__(self):
+        # Dispatch keyed on the input dtype so each handler runs without the
+        # other's per-call dtype branches; floats are the default handler
+        self._dispatch = {
+            torch.uint8: self._detect_borders_u8,
+        }
+
     @classmethod
     def INPUT_TYPES(cls):
         return {
@@ -19,134 +101,178 @@ class CropImageBorder:
                 }),
             },
         }
-    
+
     RETURN_TYPES = ("IMAGE",)
     FUNCTION = "crop_border"
     CATEGORY = "image/preprocessing"
 
-    def _check_row(self, img: torch.Tensor, row: int, threshold: float, target: float) -> bool:
-        """Check if a row matches target color (0 for black, 1 for white)"""
-        row_data = img[:, row, :]  # Get the entire row [C, W]
-        diff = torch.abs(row_data - target)
-        return bool(torch.all(diff < threshold).item())
+    @staticmethod
+    def _locate_content(nb_rows: torch.Tensor, nb_cols: torch.Tensor,
+                        H: int, W: int) -> tuple[int, int, int, int]:
+        """Turn per-row/per-column non-border counts into border coordinates;
+        the content rows/cols are wherever the count is nonzero, so the first
+        and last index give each edge"""
+        content_rows = torch.nonzero(nb_rows).flatten()
+        content_cols = torch.nonzero(nb_cols).flatten()
+        if content_rows.numel() == 0 or content_cols.numel() == 0:
+            if DEBUG:
+                print("Invalid borders detected")
+            return 0, 0, H, W
+
+        # Gather all scalars in one transfer instead of one .item() each
+        edges = torch.stack([
+            content_rows[0], content_rows[-1],
+            content_cols[0], content_cols[-1],
+        ]).tolist()
+        top, bottom, left, right = edges[0], edges[1] + 1, edges[2], edges[3] + 1
+        if DEBUG:
+            print(f"Detected borders - Top: {top}, Bottom: {bottom}, Left: {left}, Right: {right}")
+        return top, left, bottom, right
 
-    def _check_col(self, img: torch.Tensor, col: int, threshold: float, target: float) -> bool:
-        """Check if a column matches target color (0 for black, 1 for white)"""
-        col_data = img[:, :, col]  # Get the entire column [C, H]
-        diff = torch.abs(col_data - target)
-        return bool(torch.all(diff < threshold).item())
+    @staticmethod
+    def _edge_ring(img: torch.Tensor) -> torch.Tensor:
+        """Strided sample along all four image edges: one small tensor that
+        sees every border the image could have"""
+        return torch.cat([
+            img[0, ::16, :].reshape(-1),
+            img[-1, ::16, :].reshape(-1),
+            img[::16, 0, :].reshape(-1),
+            img[::16, -1, :].reshape(-1),
+        ])
 
     def _detect_borders(self, img: torch.Tensor, threshold: float) -> tuple[int, int, int, int]:
         """
-        Detect white/black borders in the image
+        Detect white/black borders in a HWC float image
         Returns: (top, left, bottom, right) border coordinates
+        (bottom and right are exclusive, so the crop is img[top:bottom, left:right])
         """
-        C, H, W = img.shape
-        
-        # Sample the corners to determine if we're looking for white or black borders
-        corner_mean = float(torch.mean(img[:, :10, :10]).item())
-        is_white = corner_mean > 0.5
-        target = 1.0 if is_white else 0.0
-        
-        print(f"Corner mean: {corner_mean:.3f}, Target: {target}")
-        
-        # Find borders
-        top = 0
-        bottom = H - 1
-        left = 0
-        right = W - 1
-        
-        # Top border
-        while top < H and self._check_row(img, top, threshold, target):
-            top += 1
-            if top >= H - 1:  # Safety check
-                top = 0
-                break
-                
-        # Bottom border
-        while bottom > top and self._check_row(img, bottom, threshold, target):
-            bottom -= 1
-            if bottom <= top:  # Safety check
-                bottom = H - 1
-                break
-                
-        # Left border
-        while left < W and self._check_col(img, left, threshold, target):
-            left += 1
-            if left >= W - 1:  # Safety check
-                left = 0
-                break
-                
-        # Right border
-        while right > left and self._check_col(img, right, threshold, target):
-            right -= 1
-            if right <= left:  # Safety check
-                right = W - 1
-                break
-        
-        # Print debug info
-        print(f"Border color: {'white' if is_white else 'black'}")
-        print(f"Image shape: {img.shape}")
-        print(f"Detected borders - Top: {top}, Bottom: {bottom}, Left: {left}, Right: {right}")
-        
-        # Validate borders
-        if top >= bottom or left >= right or \
-           top < 0 or bottom >= H or left < 0 or right >= W or \
-           (top == 0 and bottom == H-1 and left == 0 and right == W-1):
-            print("Invalid borders detected")
+        H, W, C = img.shape
+
+        # Fast path: any crop found here keeps all four corners inside the
+        # border, so if a corner pixel is not border-colored there is nothing
+        # to crop and the full-image scan can be skipped entirely
+        corners = torch.stack([img[0, 0], img[0, -1], img[-1, 0], img[-1, -1]])
+        corner_border = (corners < threshold).all(dim=-1) | (corners > 1.0 - threshold).all(dim=-1)
+        if not bool(corner_border.all()):
+            if DEBUG:
+                print("Corners are not border-colored, skipping scan")
             return 0, 0, H, W
-        
-        return top, left, bottom, right
 
+        # Classify the edge ring with one aminmax: a uniform ring keeps the
+        # cheap single-target compare, anything else tests both targets
+        edge_min, edge_max = torch.stack(torch.aminmax(self._edge_ring(img))).tolist()
+        if edge_max < threshold:
+            targets = (0.0,)
+        elif edge_min > 1.0 - threshold:
+            targets = (1.0,)
+        else:
+            targets = (0.0, 1.0)
+
+        if DEBUG:
+            print(f"Edge range: {edge_min:.3f}..{edge_max:.3f}, Targets: {targets}")
+
+        if len(targets) == 1 and _scan_borders is not None \
+                and img.device.type == "cpu" and img.dtype == torch.float32:
+            # Early-exit scan: stops at the first content pixel per edge
+            # without materializing an H x W mask
+            top, bottom, left, right = _scan_borders(
+                img.detach().numpy(), threshold, targets[0]
+            )
+            if top >= bottom or left >= right:
+                if DEBUG:
+                    print("Invalid borders detected")
+                return 0, 0, H, W
+            if DEBUG:
+                print(f"Detected borders - Top: {top}, Bottom: {bottom}, Left: {left}, Right: {right}")
+            return top, left, bottom, right
+
+        t = torch.tensor(targets, device=img.device, dtype=img.dtype)
+        global _border_counts
+        try:
+            nb_rows, nb_cols = _border_counts(img, threshold, t)
+        except Exception:
+            if _border_counts is _border_counts_eager:
+                raise
+            # Compiled variant failed at runtime; pin eager from now on
+            _border_counts = _border_counts_eager
+            nb_rows, nb_cols = _border_counts(img, threshold, t)
+        return self._locate_content(nb_rows, nb_cols, H, W)
+
+    def _detect_borders_u8(self, img: torch.Tensor, threshold: float) -> tuple[int, int, int, int]:
+        """uint8 twin of _detect_borders: compares in the integer domain, so
+        the image is never upcast to float"""
+        H, W, C = img.shape
+        k = int(threshold * 255)
+
+        corners = torch.stack([img[0, 0], img[0, -1], img[-1, 0], img[-1, -1]])
+        corner_border = (corners <= k).all(dim=-1) | (corners >= 255 - k).all(dim=-1)
+        if not bool(corner_border.all()):
+            if DEBUG:
+                print("Corners are not border-colored, skipping scan")
+            return 0, 0, H, W
+
+        edge = self._edge_ring(img).float().div_(255.0)
+        edge_min, edge_max = torch.stack(torch.aminmax(edge)).tolist()
+        if edge_max < threshold:
+            mask = img <= k
+        elif edge_min > 1.0 - threshold:
+            mask = img >= 255 - k
+        else:
+            mask = (img <= k) | (img >= 255 - k)
+
+        if DEBUG:
+            print(f"Edge range: {edge_min:.3f}..{edge_max:.3f}")
+
+        nonborder = ~mask.all(dim=-1)  # [H, W]
+        return self._locate_content(nonborder.sum(dim=1), nonborder.sum(dim=0), H, W)
+
+    @staticmethod
+    def _to_output(img: torch.Tensor) -> tuple[torch.Tensor]:
+        """Re-add the batch dimension; uint8 inputs are converted to the
+        float [0, 1] range ComfyUI expects only here, after cropping"""
+        if img.dtype == torch.uint8:
+            img = img.float().div_(255.0)
+        return (img.unsqueeze(0),)
+
+    @torch.inference_mode()
     def crop_border(self, image: torch.Tensor, threshold: float) -> tuple[torch.Tensor]:
         """Crop white/black borders from the image"""
         try:
             # Handle batch dimension if present
             if len(image.shape) == 4:
                 image = image[0]  # Take first image from batch
-            
-            # Convert HWC to CHW if needed
-            if image.shape[-1] == 3:  # If last dimension is 3, it's in HWC format
-                image = image.permute(2, 0, 1)  # Convert to CHW
-            
-            # Get original dimensions
-            C, H, W = image.shape
-            print(f"Original shape: {image.shape}")
-            print(f"Value range: {image.min():.3f} to {image.max():.3f}")
-            
-            # Detect borders
-            top, left, bottom, right = self._detect_borders(image, threshold)
-            
+
+            # Detection works directly on the HWC layout ComfyUI provides,
+            # so no permute/contiguous round-trip is needed
+            H, W, C = image.shape
+            if DEBUG:
+                amin, amax = torch.aminmax(image)  # one pass for both bounds
+                print(f"Original shape: {image.shape}")
+                print(f"Value range: {amin:.3f} to {amax:.3f}")
+
+            # Detect borders with the handler specialized for this dtype
+            detect = self._dispatch.get(image.dtype, self._detect_borders)
+            top, left, bottom, right = detect(image, threshold)
+
             # Check if borders were actually detected
             if top == 0 and left == 0 and bottom == H and right == W:
-                print("No borders detected")
-                # Convert back to original format before adding batch dimension
-                if len(image.shape) == 3 and image.shape[0] == 3:
-                    image = image.permute(1, 2, 0)  # Convert back to HWC
-                return (image.unsqueeze(0),)
-            
+                if DEBUG:
+                    print("No borders detected")
+                return self._to_output(image)
+
             # Ensure we're not cropping the entire image
             if bottom - top < 10 or right - left < 10:
-                print("Crop area too small")
-                # Convert back to original format before adding batch dimension
-                if len(image.shape) == 3 and image.shape[0] == 3:
-                    image = image.permute(1, 2, 0)  # Convert back to HWC
-                return (image.unsqueeze(0),)
-            
+                if DEBUG:
+                    print("Crop area too small")
+                return self._to_output(image)
+
             # Crop the image
-            print(f"Cropping to: {top}:{bottom}, {left}:{right}")
-            cropped = image[:, top:bottom, left:right].contiguous()
-            print(f"Cropped shape: {cropped.shape}")
-            
-            # Convert back to original format
-            if len(cropped.shape) == 3 and cropped.shape[0] == 3:
-                cropped = cropped.permute(1, 2, 0)  # Convert back to HWC
-            
-            # Add batch dimension back
-            cropped = cropped.unsqueeze(0)
-            
-            return (cropped,)
-            
+            if DEBUG:
+                print(f"Cropping to: {top}:{bottom}, {left}:{right}")
+            cropped = image[top:bottom, left:right, :]
+
+            return self._to_output(cropped)
+
         except Exception as e:
             print(f"Error in crop_border: {str(e)}")
             # Return original image with batch dimension